@@ -0,0 +1,63 @@
+# Micro-benchmarks: unit_parser vs. the number scraping it replaced.
+# unit_parser is expected to be SLOWER: it also captures and converts units
+# (KL, MWh, tonnes of steam) and parses Indian/thousands grouping, which the
+# legacy regexes did not. This measures the price of that correctness.
+# Run with: python bench_unit_parser.py
+import re
+import timeit
+
+from unit_parser import quantities_from_text, sum_usage
+
+SAMPLE_BILL = "\n".join([
+    "Electricity Bill  Account No 4500123987  Bill No 2024/05/118",
+    "Billing period 01-04-2024 to 30-04-2024",
+    "Meter reading previous 1,23,456 current 1,24,690",
+    "Total units consumed 1,234.5 kWh @ rate 7.25",
+    "Water consumption 12 KL  tank 3 m3",
+    "Boiler output 4.5 tonnes of steam, condensate 300 litres",
+    "Diesel 45.6 ltrs  unit price 92.40 amount 4,213.44",
+    "Urea application 2 t  DAP 150 kg",
+]) * 25
+
+
+# --- legacy implementations (total_dashboard.py / per-gas apps before unit_parser) ---
+def legacy_parse_number(token):
+    tok = token.replace(",", "")
+    try:
+        return float(tok)
+    except:
+        return None
+
+
+def legacy_numbers_from_text(s):
+    tokens = re.findall(r"\d+[.,]?\d*", s)
+    nums = []
+    for t in tokens:
+        v = legacy_parse_number(t)
+        if v is not None:
+            nums.append(v)
+    return nums
+
+
+def legacy_app_units(content):
+    matches = re.findall(r"\d+\.?\d*", content)
+    return sum([float(m) for m in matches])
+
+
+def bench(label, fn, number=200):
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"{label:<45} {best * 1e6:10.1f} us/call")
+    return best
+
+
+if __name__ == "__main__":
+    lines = SAMPLE_BILL.splitlines()
+    print(f"{len(lines)} lines, {len(SAMPLE_BILL)} chars\n")
+
+    legacy = bench("legacy numbers_from_text (per line)", lambda: [legacy_numbers_from_text(L) for L in lines])
+    new = bench("unit_parser.quantities_from_text (per line)", lambda: [quantities_from_text(L) for L in lines])
+    print(f"{'  -> ratio vs legacy':<45} {new / legacy:10.2f}x\n")
+
+    legacy = bench("legacy per-gas app scrape (whole doc)", lambda: legacy_app_units(SAMPLE_BILL))
+    new = bench("unit_parser.sum_usage (whole doc)", lambda: sum_usage(SAMPLE_BILL, "litres"))
+    print(f"{'  -> ratio vs legacy':<45} {new / legacy:10.2f}x")
@@ -0,0 +1,66 @@
+# --- MODULE DEFINITIONS (rename 'Fuel' to 'Fuel Emission' for clarity) ---
+MODULES = {
+    "Carbon": {
+        "keywords": ["electricity", "power", "kwh", "energy", "consumption", "meter", "total units",
+                     "tariff", "reading", "supply", "unit price", "rate", "amount", "charge",
+                     "billing period", "account no", "bill no", "meter no"],
+        "factor": 0.82,
+        "unit": "kWh",
+        "gas": "kg CO2"
+    },
+    "Methane": {
+        "keywords": ["biogas", "manure", "livestock", "digestor", "slurry", "methane", "animal",
+                     "dung", "biogas produced", "gas volume", "gas yield"],
+        "factor": 0.0009,
+        "unit": "kg",
+        "gas": "kg CH4"
+    },
+    "Nitrous Oxide": {
+        "keywords": ["fertilizer", "n2o", "nitrous", "urea", "ammonium", "application", "soil",
+                     "dap", "no3", "nh4", "nitrogen", "fertilizer kg", "manure nitrogen"],
+        "factor": 0.0056,
+        "unit": "kg",
+        "gas": "kg N2O eq"
+    },
+    "Water Usage": {
+        "keywords": ["water", "litre", "liter", "litres", "kl", "kilolitre", "flow", "tank",
+                     "meter reading", "irrigation", "consumption", "pump", "meter"],
+        "factor": 0.0003,
+        "unit": "litres",
+        "gas": "kg CO2 eq"
+    },
+    "Vapor": {
+        "keywords": ["vapor", "vapour", "evaporation", "steam", "condensate", "boiler", "evaporator",
+                     "tonnes of steam", "steam trap", "flue", "condensation", "latent heat"],
+        "factor": 0.007,
+        "unit": "m3",
+        "gas": "kg CO2"
+    },
+    "Plant Intake": {
+        "keywords": ["tree", "sapling", "planted", "plantation", "afforestation", "reforestation", "trees planted"],
+        "factor": -21.77,   # kg CO2 absorbed per tree (use as example; keep negative)
+        "unit": "trees",
+        "gas": "kg CO2 (absorbed)"
+    },
+    "Fuel Emission": {
+        "keywords": ["diesel", "petrol", "fuel", "volume", "litres", "liter", "ltrs", "qty", "quantity",
+                     "density", "unit price", "rate", "amount", "receipt", "nozzle", "tank", "pump", "bunk"],
+        "factor": 2.68,   # kg CO2 per litre diesel (approx India avg)
+        "unit": "litres",
+        "gas": "kg CO2"
+    }
+}
+
+
+# Apply each module's emission factor to its assigned usage
+def compute_emissions(module_usage):
+    module_emission = {}
+    for name, usage in module_usage.items():
+        factor = MODULES[name]["factor"]
+        emission = round(usage * factor, 2)
+        # For Plant Intake negative factor is expected (absorption). Keep emission as-is.
+        # For safety: clamp tiny negatives due to float noise to 0 for non-plant modules
+        if name != "Plant Intake" and emission < 0 and abs(emission) < 1e-6:
+            emission = 0.0
+        module_emission[name] = emission
+    return module_emission
@@ -0,0 +1,383 @@
+# Watch-folder ingestion daemon
+# Picks up bills / meter exports dropped into a directory and runs them through
+# the same extract_text -> assign_usage_per_module -> compute_emissions path as
+# the Total Emission dashboard (tabular exports via structured_ingest), storing
+# results in a local SQLite file.
+#
+# Run with: python ingest_daemon.py /path/to/dropbox --db greenguard_ingest.db
+import argparse
+import hashlib
+import io
+import json
+import logging
+import math
+import mimetypes
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from emission_modules import compute_emissions
+from structured_ingest import (STRUCTURED_EXTENSIONS, aggregate_usage, guess_column_map,
+                               guess_period_column, parse_column_map, read_columns, usage_totals)
+from text_extraction import assign_usage_per_module, extract_text
+
+# inotify (via watchdog) only wakes the loop early; the directory scan is the source of truth
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".txt") + STRUCTURED_EXTENSIONS
+
+# Failed files are retried with exponential backoff, capped at an hour, and
+# given up on after MAX_ATTEMPTS until the file or the daemon settings change
+RETRY_DELAY = 60.0
+MAX_RETRY_DELAY = 3600.0
+MAX_ATTEMPTS = 5
+
+log = logging.getLogger("greenguard.ingest")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    processed_at TEXT NOT NULL,
+    module_usage TEXT,
+    module_emission TEXT,
+    total_emission REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS periods (
+    sha256 TEXT NOT NULL,
+    period TEXT NOT NULL,
+    module TEXT NOT NULL,
+    usage REAL NOT NULL,
+    PRIMARY KEY (sha256, period, module)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    retry_at REAL NOT NULL,
+    error TEXT,
+    failed_at TEXT NOT NULL
+);
+"""
+
+
+# Retrying the same bytes with the same settings cannot succeed (no usable
+# columns, a missing --period column, no text in the document)
+class UnusableFile(Exception):
+    pass
+
+
+# extract_text expects a Streamlit UploadedFile; this gives it the same surface
+class DiskFile(io.BytesIO):
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.type = mimetypes.guess_type(path)[0] or ""
+
+
+def open_store(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# Tabular exports only go through the columnar path; one whose usage columns
+# cannot be mapped is reported, never scraped as one giant text blob.
+# Returns (module_usage, period_rows); period_rows are (period, module, usage)
+# for tabular exports and empty for bills.
+def usage_from_file(path, column_map=None, period_column=None, freq="M", dayfirst=False):
+    if path.lower().endswith(STRUCTURED_EXTENSIONS):
+        columns = read_columns(path)
+        column_map = column_map or guess_column_map(columns)
+        if not column_map:
+            raise UnusableFile("no usage columns found; pass --columns to map them")
+        if period_column is None:
+            period_column = guess_period_column([c for c in columns if c not in column_map])
+        try:
+            usage_df = aggregate_usage(path, column_map, period_column, freq, dayfirst=dayfirst)
+        except (KeyError, ValueError) as e:
+            # mapped or period columns missing from this file, bad frequency, ...
+            raise UnusableFile(str(e)) from e
+        period_rows = [(str(period), module, float(usage))
+                       for period, row in usage_df.iterrows() for module, usage in row.items()]
+        return usage_totals(usage_df), period_rows
+    content = extract_text(DiskFile(path))
+    if not content.strip():
+        raise UnusableFile("no text extracted")
+    return assign_usage_per_module(content), []
+
+
+# Runs in a worker process; no database access here
+def process_file(path, column_map=None, period_column=None, freq="M", dayfirst=False):
+    result = {"sha256": file_sha256(path), "module_usage": None, "module_emission": None,
+              "total_emission": None, "period_usage": [], "error": None, "terminal": False}
+    try:
+        module_usage, period_rows = usage_from_file(path, column_map, period_column, freq, dayfirst)
+        module_emission = compute_emissions(module_usage)
+        result.update(module_usage=module_usage, module_emission=module_emission,
+                      total_emission=round(sum(module_emission.values()), 2), period_usage=period_rows)
+    except UnusableFile as e:
+        result.update(error=str(e), terminal=True)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+# Checkpoint + result are committed together, so a crash before this point
+# simply means the file is picked up again on restart. Only successful
+# results are checkpointed; a success replaces an error row that an older
+# store may hold for the same content, but never an earlier success.
+def record_result(conn, path, stat, result):
+    size, mtime_ns = stat
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, NULL) "
+            "ON CONFLICT(sha256) DO UPDATE SET path = excluded.path, processed_at = excluded.processed_at, "
+            "module_usage = excluded.module_usage, module_emission = excluded.module_emission, "
+            "total_emission = excluded.total_emission, error = NULL "
+            "WHERE results.error IS NOT NULL",
+            (result["sha256"], path, datetime.now().isoformat(timespec="seconds"),
+             json.dumps(result["module_usage"]), json.dumps(result["module_emission"]),
+             result["total_emission"]),
+        )
+        if cur.rowcount:
+            # per-period usage follows whichever result row was written
+            conn.execute("DELETE FROM periods WHERE sha256 = ?", (result["sha256"],))
+            conn.executemany("INSERT INTO periods VALUES (?, ?, ?, ?)",
+                             [(result["sha256"], *row) for row in result["period_usage"]])
+        conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (path, size, mtime_ns, result["sha256"]),
+        )
+        conn.execute("DELETE FROM failures WHERE path = ?", (path,))
+
+
+# Failures are kept apart from results and never checkpointed: the file is
+# retried after a backoff, or as soon as it is replaced with new content.
+# Terminal failures, and files that used up MAX_ATTEMPTS, get retry_at = inf:
+# they wait for new content or for different daemon settings.
+def record_failure(conn, path, stat, error, terminal=False):
+    size, mtime_ns = stat
+    row = conn.execute("SELECT size, mtime_ns, attempts FROM failures WHERE path = ?", (path,)).fetchone()
+    attempts = row[2] + 1 if row is not None and tuple(row[:2]) == stat else 1
+    if terminal or attempts >= MAX_ATTEMPTS:
+        retry_at = math.inf
+    else:
+        retry_at = time.time() + min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, attempts, retry_at, error, datetime.now().isoformat(timespec="seconds")),
+        )
+    return attempts, retry_at
+
+
+# Failures recorded under other column/period settings may succeed now, so a
+# settings change (e.g. a restart with a corrected --columns) clears them.
+def reset_failures_on_config_change(conn, config):
+    value = json.dumps(config, sort_keys=True)
+    row = conn.execute("SELECT value FROM settings WHERE key = 'config'").fetchone()
+    if row is not None and row[0] == value:
+        return False
+    with conn:
+        conn.execute("DELETE FROM failures")
+        conn.execute("INSERT OR REPLACE INTO settings VALUES ('config', ?)", (value,))
+    return True
+
+
+class IngestDaemon:
+    def __init__(self, watch_dir, db_path, workers=4, interval=5.0, settle=2.0,
+                 column_map=None, period_column=None, freq="M", dayfirst=False):
+        self.watch_dir = os.path.abspath(watch_dir)
+        # for CSV/XLSX/Parquet; columns are guessed from headers when None
+        self.column_map = column_map
+        self.period_column = period_column
+        self.freq = freq
+        self.dayfirst = dayfirst
+        self.conn = open_store(db_path)
+        reset_failures_on_config_change(self.conn, {"columns": column_map, "period": period_column,
+                                                    "freq": freq, "dayfirst": dayfirst})
+        self.workers = workers
+        self.interval = interval
+        self.settle = settle  # seconds a file must stay untouched before it is read
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.in_flight = {}  # future -> (path, stat)
+        self.executor = None
+
+    def seen(self, path, stat):
+        row = self.conn.execute("SELECT size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+        return row is not None and tuple(row) == stat
+
+    def backing_off(self, path, stat, now):
+        row = self.conn.execute("SELECT size, mtime_ns, retry_at FROM failures WHERE path = ?", (path,)).fetchone()
+        return row is not None and tuple(row[:2]) == stat and now < row[2]
+
+    # Files that are new or changed since their checkpoint and no longer being written
+    def ready_files(self):
+        busy = {p for p, _ in self.in_flight.values()}
+        now = time.time()
+        cutoff = now - self.settle
+        ready = []
+        for entry in sorted(os.scandir(self.watch_dir), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            path = entry.path
+            if path in busy:
+                continue
+            st = entry.stat()
+            stat = (st.st_size, st.st_mtime_ns)
+            if st.st_mtime > cutoff or self.seen(path, stat) or self.backing_off(path, stat, now):
+                continue
+            ready.append((path, stat))
+        return ready
+
+    def collect(self, timeout=0):
+        if not self.in_flight:
+            return
+        done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, stat = self.in_flight.pop(future)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # a worker died (e.g. a native crash in PyMuPDF); start a fresh pool
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False)
+                    self.executor = None
+                result = {"error": "worker process crashed", "terminal": False}
+            except OSError as e:
+                # file vanished or unreadable mid-read
+                result = {"error": f"could not read file: {e}", "terminal": False}
+            if result["error"]:
+                attempts, retry_at = record_failure(self.conn, path, stat, result["error"], result["terminal"])
+                if retry_at == math.inf:
+                    log.error("%s: %s (attempt %d, not retrying until the file or settings change)",
+                              path, result["error"], attempts)
+                else:
+                    log.warning("%s: %s (attempt %d, will retry)", path, result["error"], attempts)
+            else:
+                record_result(self.conn, path, stat, result)
+                log.info("%s: total emission %s", path, result["total_emission"])
+
+    def get_executor(self):
+        if self.executor is None:
+            # Processes, not threads: OCR/PDF parsing is CPU-bound and PyMuPDF is
+            # not thread-safe. "spawn" avoids forking the watchdog thread and the
+            # open SQLite connection into the workers.
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def run_once(self):
+        for path, stat in self.ready_files():
+            # bounded concurrency: never more than `workers` files in flight
+            while len(self.in_flight) >= self.workers:
+                self.collect(timeout=None)
+            future = self.get_executor().submit(process_file, path, self.column_map,
+                                              self.period_column, self.freq, self.dayfirst)
+            self.in_flight[future] = (path, stat)
+        self.collect()
+
+    def start_observer(self):
+        if Observer is None:
+            log.info("watchdog not installed; polling %s every %ss", self.watch_dir, self.interval)
+            return None
+
+        daemon = self
+
+        class WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                daemon.wake.set()
+
+        observer = Observer()
+        observer.schedule(WakeHandler(), self.watch_dir, recursive=False)
+        observer.start()
+        log.info("watching %s", self.watch_dir)
+        return observer
+
+    def run(self, once=False):
+        observer = None if once else self.start_observer()
+        try:
+            while True:
+                self.run_once()
+                if once:
+                    break
+                # wake on fs events, but rescan at least every `interval` to
+                # catch files that were still settling when their event fired
+                self.wake.wait(timeout=self.interval)
+                self.wake.clear()
+                if self.stopped.is_set():
+                    break
+        finally:
+            while self.in_flight:
+                self.collect(timeout=None)
+            if self.executor is not None:
+                self.executor.shutdown()
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GreenGuard AI watch-folder ingestion daemon")
+    parser.add_argument("watch_dir", help="directory where bills and meter exports are dropped")
+    parser.add_argument("--db", default="greenguard_ingest.db", help="SQLite results store")
+    parser.add_argument("--workers", type=int, default=4, help="files processed concurrently")
+    parser.add_argument("--interval", type=float, default=5.0, help="polling interval in seconds")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="seconds a file must be unmodified before it is processed")
+    parser.add_argument("--once", action="store_true", help="process the current backlog and exit")
+    parser.add_argument("--columns", help='column mapping for tabular exports, e.g. "kwh=Carbon,water_kl=Water Usage:kl"')
+    parser.add_argument("--period", help="date column of tabular exports (default: guessed from headers)")
+    parser.add_argument("--freq", default="M", help="pandas period frequency for tabular exports (D, W, M, Q, Y)")
+    parser.add_argument("--dayfirst", action="store_true", help="read export dates like 05/01/2024 as 5 January")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    daemon = IngestDaemon(args.watch_dir, args.db, workers=args.workers,
+                          interval=args.interval, settle=args.settle,
+                          column_map=parse_column_map(args.columns) if args.columns else None,
+                          period_column=args.period, freq=args.freq, dayfirst=args.dayfirst)
+    try:
+        daemon.run(once=args.once)
+    except KeyboardInterrupt:
+        pass  # in-flight files were drained and recorded by run()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,8 @@ import streamlit as st
 import pytesseract
 from PIL import Image
 import fitz
-import re
 from report_generator import generate_pdf_report
+from unit_parser import sum_usage
 import matplotlib.pyplot as plt
 
 def extract_text(uploaded_file):
@@ -31,8 +31,7 @@ def methane_app():
 
         keywords = ["natural gas", "methane", "ch4"]
         if contains_keywords(content, keywords):
-            matches = re.findall(r"\d+\.?\d*", content)
-            units = sum([float(m) for m in matches])
+            units = sum_usage(content, "m3")
             emission = round(units * 0.25, 4)
 
             st.success(f"Estimated Methane Emission: {emission} kg CO2 eq")
@@ -2,8 +2,8 @@ import streamlit as st
 import pytesseract
 from PIL import Image
 import fitz  
-import re
 from report_generator import generate_pdf_report
+from unit_parser import sum_usage
 import matplotlib.pyplot as plt
 
 def extract_text(uploaded_file):
@@ -33,8 +33,7 @@ def plant_intake_app():
 
             keywords = ["sapling", "tree", "planted", "green cover"]
             if contains_keywords(content, keywords):
-                numbers = re.findall(r"\d+\.?\d*", content)
-                saplings = sum([float(num) for num in numbers])
+                saplings = sum_usage(content, "trees")
 
                 # IPCC-estimated CO2 absorption: 21.77 kg/year per sapling
                 absorbed = round(saplings * 21.77, 2)
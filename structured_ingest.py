@@ -0,0 +1,248 @@
+# Columnar ingestion for CSV / XLSX / Parquet meter exports
+# Tabular exports skip OCR and regex scraping: the mapped columns are read in
+# fixed-size chunks, converted to each module's unit and summed per period
+# with vectorized pandas ops, so memory stays bounded by the chunk size.
+#
+# Run with: python structured_ingest.py export.csv --columns "kwh=Carbon,water_kl=Water Usage:kl" --period date
+import argparse
+import re
+
+import pandas as pd
+
+from emission_modules import MODULES, compute_emissions
+from unit_parser import UNITS, conversion_factor
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+STRUCTURED_EXTENSIONS = (".csv", ".xlsx", ".parquet")
+CHUNK_ROWS = 250_000
+# Rows whose date is missing or unparseable are kept under this period
+UNKNOWN_PERIOD = "unknown"
+
+# Header words marking a price or per-unit rate ("Rate (Rs/L)", "Tariff (Rs/kWh)")
+PRICE_WORDS = {"rate", "price", "tariff", "amount", "cost", "charge", "charges", "rs", "inr", "per"}
+PERIOD_WORDS = ("date", "timestamp", "time", "period", "month", "day")
+
+
+# "kwh=Carbon,water_kl=Water Usage:kl" -> {"kwh": ("Carbon", None), "water_kl": ("Water Usage", "kl")}
+def parse_column_map(spec: str):
+    column_map = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        column, _, target = item.partition("=")
+        module, _, unit = target.partition(":")
+        module = module.strip()
+        if module not in MODULES:
+            raise ValueError(f"Unknown module '{module}' for column '{column}'. Choose from: {', '.join(MODULES)}")
+        unit = unit.strip() or None
+        column_factor(module, unit)  # raises ValueError for units the module cannot use
+        column_map[column.strip()] = (module, unit)
+    return column_map
+
+
+# Map columns whose header names a unit ("Usage (kWh)", "water_kl") to a module.
+# Keywords in the header pick the module; without keywords, the unit decides
+# only when a single module is measured in it (kWh -> Carbon, but litres could
+# be Water Usage or Fuel Emission). Price and per-unit headers ("Rate (Rs/L)"),
+# headers without a unit, and units the chosen module cannot convert are left
+# out; those need an explicit --columns mapping.
+def guess_column_map(columns):
+    column_map = {}
+    for column in columns:
+        header = str(column).lower()
+        words = re.findall(r"[a-z0-9³]+", header)
+        if "/" in header or PRICE_WORDS.intersection(words):
+            continue
+        unit = next((w for w in words if w in UNITS), None)
+        if unit is None:
+            continue
+        # the unit word itself ("litres", "kwh") must not vote for a module
+        header = " ".join(w for w in words if w != unit)
+        # only modules that can take the unit vote ("Consumption (litres)" is
+        # Water Usage, not Carbon, even though both list "consumption")
+        candidates = [m for m in MODULES if _unit_factor(m, unit) is not None]
+        module_counts = {}
+        for mname in candidates:
+            cnt = sum(header.count(kw) for kw in MODULES[mname]["keywords"])
+            if cnt > 0:
+                module_counts[mname] = cnt
+        if module_counts:
+            module = max(module_counts, key=module_counts.get)
+        elif len(candidates) == 1:
+            module = candidates[0]
+        else:
+            continue
+        column_map[column] = (module, unit)
+    return column_map
+
+
+# First column whose header reads like a date/period, or None
+def guess_period_column(columns):
+    for column in columns:
+        if any(w in PERIOD_WORDS for w in re.findall(r"[a-z]+", str(column).lower())):
+            return column
+    return None
+
+
+def _unit_factor(module, unit):
+    target_unit = MODULES[module]["unit"]
+    factor = conversion_factor(unit, target_unit) if unit in UNITS else None
+    # a mass column mapped to the (m3) Vapor module is metered steam
+    if factor is None and target_unit == "m3" and f"{unit} of steam" in UNITS:
+        factor = conversion_factor(f"{unit} of steam", target_unit)
+    return factor
+
+
+# Multiplier that turns a column measured in `unit` into the module's unit
+def column_factor(module, unit):
+    if not unit:
+        return 1.0
+    factor = _unit_factor(module, unit.lower())
+    if factor is None:
+        raise ValueError(f"Unit '{unit}' cannot be converted to {MODULES[module]['unit']} for module '{module}'")
+    return factor
+
+
+# Sources are paths or file-like uploads (anything with a .name)
+def _source_name(source):
+    return str(getattr(source, "name", source)).lower()
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def read_columns(path):
+    lower = _source_name(path)
+    _rewind(path)
+    if lower.endswith(".xlsx"):
+        if load_workbook is None:
+            raise ImportError("openpyxl is required to read .xlsx exports")
+        wb = load_workbook(path, read_only=True, data_only=True)
+        header = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+        wb.close()
+        return [str(h) for h in header]
+    if lower.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("pyarrow is required to read .parquet exports")
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _excel_chunks(path, usecols, chunksize):
+    # pandas.read_excel has no chunksize; stream rows through openpyxl instead
+    if load_workbook is None:
+        raise ImportError("openpyxl is required to read .xlsx exports")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) for h in next(rows, ())]
+        idx = [header.index(c) for c in usecols]
+        buf = []
+        for row in rows:
+            buf.append([row[i] if i < len(row) else None for i in idx])
+            if len(buf) >= chunksize:
+                yield pd.DataFrame(buf, columns=usecols)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=usecols)
+    finally:
+        wb.close()
+
+
+def _parquet_chunks(path, usecols, chunksize):
+    if pq is None:
+        raise ImportError("pyarrow is required to read .parquet exports")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=usecols):
+        yield batch.to_pandas()
+
+
+def read_chunks(path, usecols, chunksize=CHUNK_ROWS):
+    lower = _source_name(path)
+    _rewind(path)
+    if lower.endswith(".xlsx"):
+        return _excel_chunks(path, usecols, chunksize)
+    if lower.endswith(".parquet"):
+        return _parquet_chunks(path, usecols, chunksize)
+    return pd.read_csv(path, usecols=usecols, chunksize=chunksize, thousands=",")
+
+
+# Returns a DataFrame indexed by period label (or a single "all" row when no
+# period column is given) with one usage column per mapped module. Rows with
+# a missing or unparseable date are summed under UNKNOWN_PERIOD, so the
+# totals always cover every row. dayfirst / date_format are passed to
+# pandas.to_datetime for exports like "05/01/2024".
+def aggregate_usage(path, column_map, period_column=None, freq="M", chunksize=CHUNK_ROWS,
+                    dayfirst=False, date_format=None):
+    value_columns = list(column_map)
+    usecols = value_columns + ([period_column] if period_column else [])
+    factors = pd.Series({c: column_factor(*column_map[c]) for c in value_columns})
+    by_module = {}
+    for column, (module, _) in column_map.items():
+        by_module.setdefault(module, []).append(column)
+
+    total = None
+    for chunk in read_chunks(path, usecols, chunksize):
+        values = chunk[value_columns].apply(pd.to_numeric, errors="coerce").fillna(0.0) * factors
+        usage = pd.DataFrame({m: values[cols].sum(axis=1) for m, cols in by_module.items()})
+        if period_column:
+            dates = pd.to_datetime(chunk[period_column], errors="coerce",
+                                   dayfirst=dayfirst, format=date_format)
+            period = dates.dt.to_period(freq).astype(str).where(dates.notna(), UNKNOWN_PERIOD)
+            part = usage.groupby(period, dropna=False).sum()
+        else:
+            part = usage.sum().to_frame("all").T
+        # fold each chunk in immediately so memory does not grow with row count
+        total = part if total is None else total.add(part, fill_value=0.0)
+
+    if total is None:
+        return pd.DataFrame(columns=list(by_module))
+    return total.sort_index()
+
+
+# Collapse per-period usage into the {module: usage} shape used by compute_emissions
+def usage_totals(usage_df):
+    sums = usage_df.sum()
+    return {name: float(sums.get(name, 0.0)) for name in MODULES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate CSV/XLSX/Parquet meter exports per module")
+    parser.add_argument("path", help="export file")
+    parser.add_argument("--columns", help='column mapping, e.g. "kwh=Carbon,water_kl=Water Usage:kl" '
+                                          "(default: guessed from headers that name a unit)")
+    parser.add_argument("--period", help="date column to group by (default: guessed from headers)")
+    parser.add_argument("--freq", default="M", help="pandas period frequency (D, W, M, Q, Y)")
+    parser.add_argument("--dayfirst", action="store_true", help="read dates like 05/01/2024 as 5 January")
+    parser.add_argument("--date-format", help='strftime format of the period column, e.g. "%%d.%%m.%%Y"')
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows read per chunk")
+    args = parser.parse_args()
+
+    columns = read_columns(args.path)
+    column_map = parse_column_map(args.columns) if args.columns else guess_column_map(columns)
+    if not column_map:
+        parser.error("No usage columns found; pass --columns to map them explicitly.")
+    period_column = args.period or guess_period_column([c for c in columns if c not in column_map])
+
+    usage_df = aggregate_usage(args.path, column_map, period_column, args.freq, args.chunksize,
+                               dayfirst=args.dayfirst, date_format=args.date_format)
+    if period_column and UNKNOWN_PERIOD in usage_df.index:
+        print(f"Note: rows without a readable '{period_column}' date are under '{UNKNOWN_PERIOD}'.")
+    print(usage_df.to_string())
+    module_emission = compute_emissions(usage_totals(usage_df))
+    print()
+    for name, emission in module_emission.items():
+        if name in usage_df.columns:
+            print(f"{name}: {emission} {MODULES[name]['gas']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import math
+import os
+import time
+
+import pytest
+
+ingest_daemon = pytest.importorskip("ingest_daemon")
+
+from ingest_daemon import (MAX_ATTEMPTS, RETRY_DELAY, IngestDaemon, open_store, record_failure,
+                           record_result, reset_failures_on_config_change)
+
+BILL = "Electricity bill 100 kWh\nWater consumption 2 KL\n"
+CSV = (
+    "Date,Energy (kWh)\n"
+    "2024-01-05,100\n"
+    "2024-01-20,200\n"
+    "2024-02-03,50\n"
+)
+
+
+def success(sha256="abc", total=82.0, periods=(("2024-01", "Carbon", 100.0),)):
+    return {"sha256": sha256, "module_usage": {"Carbon": 100.0}, "module_emission": {"Carbon": total},
+            "total_emission": total, "period_usage": list(periods), "error": None}
+
+
+def age(path, seconds=120):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_record_result_replaces_error_rows_only(tmp_path):
+    conn = open_store(str(tmp_path / "store.db"))
+    # an older store checkpointed failures as error rows
+    conn.execute("INSERT INTO results VALUES ('abc', 'old.csv', '2024-01-01', NULL, NULL, NULL, 'boom')")
+    conn.execute("INSERT INTO failures VALUES ('a.csv', 1, 1, 2, 0, 'boom', '2024-01-01')")
+
+    record_result(conn, "a.csv", (1, 1), success())
+    assert conn.execute("SELECT path, total_emission, error FROM results").fetchall() == [("a.csv", 82.0, None)]
+    assert conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0] == 0
+
+    # same content under another name: the first success and its periods stay
+    record_result(conn, "copy.csv", (1, 2), success(total=99.0, periods=[("2024-02", "Carbon", 1.0)]))
+    assert conn.execute("SELECT path, total_emission FROM results").fetchall() == [("a.csv", 82.0)]
+    assert conn.execute("SELECT period, usage FROM periods").fetchall() == [("2024-01", 100.0)]
+    assert conn.execute("SELECT path FROM files ORDER BY path").fetchall() == [("a.csv",), ("copy.csv",)]
+
+    # the same file recorded twice is counted once
+    record_result(conn, "a.csv", (1, 1), success())
+    assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM periods").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 2
+
+
+def test_record_failure_backs_off_and_resets_on_change(tmp_path):
+    conn = open_store(str(tmp_path / "store.db"))
+    start = time.time()
+    attempts, retry_at = record_failure(conn, "a.pdf", (10, 1), "boom")
+    assert attempts == 1 and retry_at >= start + RETRY_DELAY
+    attempts, retry_at = record_failure(conn, "a.pdf", (10, 1), "boom")
+    assert attempts == 2 and retry_at >= start + 2 * RETRY_DELAY
+
+    # a new version of the file starts over
+    attempts, retry_at = record_failure(conn, "a.pdf", (11, 2), "boom")
+    assert attempts == 1 and retry_at < start + 2 * RETRY_DELAY
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        attempts, retry_at = record_failure(conn, "a.pdf", (11, 2), "boom")
+    assert attempts == MAX_ATTEMPTS and retry_at == math.inf
+    assert conn.execute("SELECT retry_at FROM failures").fetchone()[0] == math.inf
+
+
+def test_terminal_failures_wait_for_new_settings(tmp_path):
+    conn = open_store(str(tmp_path / "store.db"))
+    assert reset_failures_on_config_change(conn, {"columns": None})
+    assert record_failure(conn, "a.csv", (10, 1), "no usage columns found", terminal=True) == (1, math.inf)
+
+    assert not reset_failures_on_config_change(conn, {"columns": None})
+    assert conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0] == 1
+    assert reset_failures_on_config_change(conn, {"columns": {"kwh": ["Carbon", None]}})
+    assert conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0] == 0
+
+
+def test_ready_files_skips_checkpointed_settling_and_backing_off(tmp_path):
+    watch = tmp_path / "inbox"
+    watch.mkdir()
+    for name in ("done.txt", "failed.txt", "new.txt", "settling.txt", "notes.docx"):
+        (watch / name).write_text(BILL)
+    for name in ("done.txt", "failed.txt", "new.txt", "notes.docx"):
+        age(watch / name)
+
+    daemon = IngestDaemon(str(watch), str(tmp_path / "store.db"), settle=60.0)
+    stats = {}
+    for name in ("done.txt", "failed.txt"):
+        st = os.stat(watch / name)
+        stats[name] = (st.st_size, st.st_mtime_ns)
+    record_result(daemon.conn, str(watch / "done.txt"), stats["done.txt"], success())
+    record_failure(daemon.conn, str(watch / "failed.txt"), stats["failed.txt"], "boom")
+
+    assert [os.path.basename(p) for p, _ in daemon.ready_files()] == ["new.txt"]
+
+    # a changed file is picked up again, even while its old version backs off
+    (watch / "failed.txt").write_text(BILL + "Diesel 5 litres\n")
+    age(watch / "failed.txt")
+    assert [os.path.basename(p) for p, _ in daemon.ready_files()] == ["failed.txt", "new.txt"]
+
+
+def test_run_once_over_fixtures(tmp_path):
+    watch = tmp_path / "inbox"
+    watch.mkdir()
+    (watch / "bill.txt").write_text(BILL)
+    (watch / "export.csv").write_text(CSV)
+    (watch / "prices.csv").write_text("Date,Rate (Rs/L)\n2024-01-05,92.4\n")
+    for name in ("bill.txt", "export.csv", "prices.csv"):
+        age(watch / name)
+    db_path = str(tmp_path / "store.db")
+
+    IngestDaemon(str(watch), db_path, workers=2, settle=0.0).run(once=True)
+    conn = open_store(db_path)
+    rows = dict(conn.execute("SELECT path, module_usage FROM results"))
+    bill = json.loads(rows[str(watch / "bill.txt")])
+    assert bill["Carbon"] == 100.0 and bill["Water Usage"] == 2000.0
+    assert json.loads(rows[str(watch / "export.csv")])["Carbon"] == 350.0
+    assert conn.execute("SELECT period, usage FROM periods WHERE module = 'Carbon' ORDER BY period").fetchall() == [
+        ("2024-01", 300.0), ("2024-02", 50.0)]
+    # unmappable columns are terminal, not retried on the next pass
+    assert conn.execute("SELECT path, attempts, retry_at FROM failures").fetchall() == [
+        (str(watch / "prices.csv"), 1, math.inf)]
+
+    daemon = IngestDaemon(str(watch), db_path, settle=0.0)
+    assert daemon.ready_files() == []
+    # restarting with a mapping for the price column retries it
+    daemon = IngestDaemon(str(watch), db_path, settle=0.0, column_map={"Rate (Rs/L)": ("Fuel Emission", None)})
+    assert [p for p, _ in daemon.ready_files()] == [str(watch / "prices.csv")]
@@ -0,0 +1,107 @@
+import io
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from structured_ingest import (UNKNOWN_PERIOD, aggregate_usage, column_factor, guess_column_map,
+                               guess_period_column, parse_column_map, usage_totals)
+from unit_parser import STEAM_M3_PER_KG
+
+CSV = (
+    "Date,Energy (kWh),water_kl,Rate (Rs/L),Amount\n"
+    "2024-01-05,100,1,92.4,4213\n"
+    "2024-01-20,\"1,200\",2,92.4,4213\n"
+    "2024-02-03,50,0.5,93.1,4300\n"
+)
+
+
+@pytest.mark.parametrize("header", [
+    "Rate (Rs/L)", "Unit Price (Rs/ltr)", "Tariff (Rs/kWh)", "Amount", "Meter No",
+    "Qty kg",  # "qty" picks Fuel Emission, which is measured in litres
+    "Volume kg",
+])
+def test_guess_skips_prices_and_incompatible_units(header):
+    assert guess_column_map([header]) == {}
+
+
+def test_guess_maps_usage_columns():
+    assert guess_column_map(["Energy (kWh)", "water_kl", "diesel_litres", "Steam (t)", "Urea kg"]) == {
+        "Energy (kWh)": ("Carbon", "kwh"),
+        "water_kl": ("Water Usage", "kl"),
+        "diesel_litres": ("Fuel Emission", "litres"),
+        "Steam (t)": ("Vapor", "t"),
+        "Urea kg": ("Nitrous Oxide", "kg"),
+    }
+
+
+def test_guess_needs_keywords_when_unit_is_ambiguous():
+    # litres could be Water Usage or Fuel Emission
+    assert guess_column_map(["Usage (litres)"]) == {}
+    assert guess_column_map(["Usage (kWh)"]) == {"Usage (kWh)": ("Carbon", "kwh")}
+
+
+def test_column_factor():
+    assert column_factor("Water Usage", "KL") == 1000.0
+    assert column_factor("Carbon", "MWh") == 1000.0
+    assert column_factor("Vapor", "t") == pytest.approx(STEAM_M3_PER_KG * 1000)
+    assert column_factor("Carbon", None) == 1.0
+    for module, unit in [("Carbon", "kl"), ("Carbon", "kg"), ("Plant Intake", "kg"), ("Methane", "litres")]:
+        with pytest.raises(ValueError):
+            column_factor(module, unit)
+
+
+def test_parse_column_map():
+    assert parse_column_map("kwh=Carbon, water=Water Usage:kl") == {
+        "kwh": ("Carbon", None), "water": ("Water Usage", "kl")}
+    with pytest.raises(ValueError):
+        parse_column_map("x=Carbon:kl")
+    with pytest.raises(ValueError):
+        parse_column_map("x=Electricity")
+
+
+def test_aggregate_usage_per_period(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(CSV)
+    column_map = guess_column_map(["Energy (kWh)", "water_kl", "Rate (Rs/L)", "Amount"])
+    assert guess_period_column(["Energy (kWh)", "Date"]) == "Date"
+
+    usage_df = aggregate_usage(str(path), column_map, "Date", chunksize=2)
+    assert [str(p) for p in usage_df.index] == ["2024-01", "2024-02"]
+    assert usage_df["Carbon"].tolist() == [1300.0, 50.0]
+    assert usage_df["Water Usage"].tolist() == [3000.0, 500.0]
+
+    totals = usage_totals(usage_df)
+    assert totals["Carbon"] == 1350.0 and totals["Fuel Emission"] == 0.0
+
+
+def test_aggregate_usage_from_upload():
+    upload = io.BytesIO(CSV.encode())
+    upload.name = "export.csv"
+    usage_df = aggregate_usage(upload, {"Energy (kWh)": ("Carbon", "kwh")})
+    assert usage_df.loc["all", "Carbon"] == 1350.0
+
+
+def test_guess_votes_only_among_unit_compatible_modules():
+    # "consumption" is a Carbon and a Water Usage keyword; only Water Usage takes litres
+    assert guess_column_map(["Consumption (litres)"]) == {"Consumption (litres)": ("Water Usage", "litres")}
+
+
+def test_aggregate_usage_keeps_rows_with_bad_dates(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(
+        "Date,Energy (kWh)\n"
+        "05/01/2024,100\n"
+        "not a date,200\n"
+        ",300\n"
+        "03/02/2024,50\n"
+    )
+    usage_df = aggregate_usage(str(path), {"Energy (kWh)": ("Carbon", "kwh")}, "Date", chunksize=2,
+                               dayfirst=True)
+    assert [str(p) for p in usage_df.index] == ["2024-01", "2024-02", UNKNOWN_PERIOD]
+    assert usage_df["Carbon"].tolist() == [100.0, 50.0, 500.0]
+    assert usage_totals(usage_df)["Carbon"] == 650.0
+
+    usage_df = aggregate_usage(str(path), {"Energy (kWh)": ("Carbon", "kwh")}, "Date",
+                               date_format="%d/%m/%Y")
+    assert usage_df.loc["2024-02", "Carbon"] == 50.0
@@ -0,0 +1,77 @@
+import pytest
+
+from unit_parser import STEAM_M3_PER_KG, conversion_factor, quantities_from_text, sum_usage, to_unit
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,234.5", [1234.5]),
+    ("1,234,567.8", [1234567.8]),
+    ("1,23,456", [123456.0]),
+    ("12,34,56,789.5", [123456789.5]),
+    # malformed groupings are comma-listed numbers, not one big value
+    ("12,3456", [12.0, 3456.0]),
+    ("1,5", [1.0, 5.0]),
+    ("5, 6", [5.0, 6.0]),
+    ("bill 2024-05 reading 98765", [2024.0, 5.0, 98765.0]),
+])
+def test_number_formats(text, expected):
+    assert [v for v, _ in quantities_from_text(text)] == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("total 1,234.5 kWh", [(1234.5, "kwh")]),
+    ("water 12 KL used", [(12.0, "kl")]),
+    ("1,23,456 L", [(123456.0, "l")]),
+    ("5 t urea 20kg", [(5.0, "t"), (20.0, "kg")]),
+    ("boiler 3 tonnes of steam", [(3.0, "tonnes of steam")]),
+    ("3 T Steam", [(3.0, "t of steam")]),
+    ("4 m³ and 2m3", [(4.0, "m³"), (2.0, "m3")]),
+    # the "3" of a unit is not a number
+    ("10 m3/hr", [(10.0, "m3")]),
+    ("3 Cubic  Meters", [(3.0, "cubic meters")]),
+    ("tariff 5 tariff", [(5.0, None)]),
+    # the unit belongs to the last number of a comma list
+    ("1,5 kg", [(1.0, None), (5.0, "kg")]),
+])
+def test_quantities_keep_raw_value_and_unit(text, expected):
+    assert quantities_from_text(text) == expected
+
+
+@pytest.mark.parametrize("unit, target, factor", [
+    ("kl", "litres", 1000.0),
+    ("kl", "m3", 1.0),
+    ("m3", "litres", 1000.0),
+    ("mwh", "kWh", 1000.0),
+    ("t", "kg", 1000.0),
+    ("tonnes of steam", "m3", STEAM_M3_PER_KG * 1000),
+    ("kg of steam", "m3", STEAM_M3_PER_KG),
+])
+def test_compatible_units_convert(unit, target, factor):
+    assert conversion_factor(unit, target) == pytest.approx(factor)
+
+
+@pytest.mark.parametrize("unit, target", [
+    ("kl", "kWh"),
+    ("t", "trees"),
+    ("t", "m3"),  # plain tonnes are not assumed to be steam
+    ("kwh", "litres"),
+    ("tonnes of steam", "kWh"),
+])
+def test_incompatible_units_keep_raw_value(unit, target):
+    assert conversion_factor(unit, target) is None
+    assert to_unit(12.0, unit, target) == 12.0
+
+
+def test_sum_usage():
+    assert sum_usage("Water 12 KL", "kWh") == 12.0
+    assert sum_usage("2 t saplings", "trees") == 2.0
+    assert sum_usage("Water 12 KL, 3 m3 and 10 litres", "litres") == 15010.0
+    assert sum_usage("boiler 3 tonnes of steam", "m3") == pytest.approx(3 * STEAM_M3_PER_KG * 1000)
+    assert sum_usage("1,5 kg and 2 t", "kg") == 2006.0
+
+
+def test_sum_usage_matches_quantities():
+    text = "Diesel 45.6 ltrs @ 92.40\nWater 1,23,456 L, 2 KL\nBoiler 4.5 t steam 12,3456"
+    for target in ("litres", "m3", "kWh", "kg"):
+        expected = sum(to_unit(v, u, target) for v, u in quantities_from_text(text))
+        assert sum_usage(text, target) == pytest.approx(expected)
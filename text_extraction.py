@@ -0,0 +1,78 @@
+# Text extraction and keyword-based usage assignment for bills, shared by the
+# Streamlit dashboard and the headless ingestion daemon (no UI imports here)
+import pytesseract
+from PIL import Image
+import fitz  # PyMuPDF
+from emission_modules import MODULES
+from unit_parser import quantities_from_text, to_unit
+
+# Read text from uploaded file (pdf/image/txt); errors propagate to the caller
+def extract_text(uploaded_file):
+    file_type = uploaded_file.type.lower() if hasattr(uploaded_file, "type") else ""
+    if "pdf" in file_type:
+        raw = uploaded_file.read()
+        doc = fitz.open(stream=raw, filetype="pdf")
+        return "\n".join([page.get_text() for page in doc])
+    elif "image" in file_type or uploaded_file.name.lower().endswith((".png", ".jpg", ".jpeg")):
+        image = Image.open(uploaded_file)
+        return pytesseract.image_to_string(image)
+    elif "text" in file_type or uploaded_file.name.lower().endswith(".txt"):
+        return uploaded_file.read().decode("utf-8", errors="ignore")
+    else:
+        # fallback: try reading and OCR if binary
+        try:
+            image = Image.open(uploaded_file)
+            return pytesseract.image_to_string(image)
+        except:
+            return uploaded_file.read().decode("utf-8", errors="ignore")
+
+# The algorithm:
+# - Split file into lines
+# - For each line, find which modules' keywords appear (count occurrences)
+# - Assign numbers in that line to the module with highest keyword hits (tie -> first)
+# - If no numbers in matched line, look +/-2 lines for numbers
+# - Convert each number to the module's unit (KL -> litres, tonnes of steam -> m3)
+def assign_usage_per_module(content: str):
+    module_usage = {name: 0.0 for name in MODULES.keys()}
+    lines = content.splitlines()
+    lowered_lines = [L.lower() for L in lines]
+    # each line is tokenized at most once, even when it is a neighbour of several matches
+    line_quantities = {}
+
+    def quantities_at(i):
+        if i not in line_quantities:
+            line_quantities[i] = quantities_from_text(lowered_lines[i])
+        return line_quantities[i]
+
+    for idx, line in enumerate(lowered_lines):
+        # count keyword matches per module
+        module_counts = {}
+        for mname, cfg in MODULES.items():
+            cnt = 0
+            for kw in cfg["keywords"]:
+                cnt += line.count(kw.lower())
+            if cnt > 0:
+                module_counts[mname] = cnt
+
+        if not module_counts:
+            continue  # no module keywords on this line
+
+        # choose module with highest count for this line
+        chosen_module = max(module_counts.items(), key=lambda x: (x[1], -list(MODULES.keys()).index(x[0])))[0]
+
+        quantities = quantities_at(idx)
+        # If no numbers in this exact line, look nearby (prev/next up to 2 lines)
+        if not quantities:
+            for offset in (1, -1, 2, -2):
+                nidx = idx + offset
+                if 0 <= nidx < len(lowered_lines):
+                    nearby = quantities_at(nidx)
+                    if nearby:
+                        quantities = nearby
+                        break
+
+        if quantities:
+            target_unit = MODULES[chosen_module]["unit"]
+            module_usage[chosen_module] += sum(to_unit(v, u, target_unit) for v, u in quantities)
+
+    return module_usage
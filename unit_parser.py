@@ -0,0 +1,149 @@
+import re
+from functools import lru_cache
+
+# Saturated steam at 100 °C / 1 atm occupies ~1.673 m3 per kg
+STEAM_M3_PER_KG = 1.673
+
+# unit token (lowercase) -> (normalized unit, multiplier)
+UNITS = {
+    "kwh": ("kWh", 1.0),
+    "mwh": ("kWh", 1000.0),
+    "units": ("kWh", 1.0),
+    "l": ("litres", 1.0),
+    "ltr": ("litres", 1.0),
+    "ltrs": ("litres", 1.0),
+    "litre": ("litres", 1.0),
+    "litres": ("litres", 1.0),
+    "liter": ("litres", 1.0),
+    "liters": ("litres", 1.0),
+    "kl": ("litres", 1000.0),
+    "kilolitre": ("litres", 1000.0),
+    "kilolitres": ("litres", 1000.0),
+    "kiloliter": ("litres", 1000.0),
+    "kiloliters": ("litres", 1000.0),
+    "m3": ("m3", 1.0),
+    "m³": ("m3", 1.0),
+    "cubic meter": ("m3", 1.0),
+    "cubic meters": ("m3", 1.0),
+    "cubic metre": ("m3", 1.0),
+    "cubic metres": ("m3", 1.0),
+    "kg": ("kg", 1.0),
+    "kgs": ("kg", 1.0),
+    "t": ("kg", 1000.0),
+    "ton": ("kg", 1000.0),
+    "tons": ("kg", 1000.0),
+    "tonne": ("kg", 1000.0),
+    "tonnes": ("kg", 1000.0),
+    # steam is metered by mass but the Vapor module works in volume
+    "kg of steam": ("m3", STEAM_M3_PER_KG),
+    "t of steam": ("m3", STEAM_M3_PER_KG * 1000),
+    "ton of steam": ("m3", STEAM_M3_PER_KG * 1000),
+    "tons of steam": ("m3", STEAM_M3_PER_KG * 1000),
+    "tonne of steam": ("m3", STEAM_M3_PER_KG * 1000),
+    "tonnes of steam": ("m3", STEAM_M3_PER_KG * 1000),
+}
+
+# Conversions between normalized units that are physically exact
+CONVERSIONS = {
+    ("litres", "m3"): 0.001,
+    ("m3", "litres"): 1000.0,
+}
+
+# A number is scanned loosely (digits with optional commas and decimals) and
+# its comma layout is only validated when it actually contains a comma:
+#   1,23,456.7  (Indian lakh/crore grouping)
+#   1,234,567.8 (thousands grouping)
+# Anything else ("12,3456", "1,5") is read as separate comma-listed numbers.
+GROUPED_NUMBER_RE = re.compile(r"\d{1,2}(?:,\d{2})*,\d{3}(?:\.\d+)?|\d{1,3}(?:,\d{3})+(?:\.\d+)?")
+# The word after a number is looked up in UNITS; the unit group only engages when a letter follows, and words that are not units
+# normalize to None. Case-insensitivity is scoped to the fixed words because a
+# global re.IGNORECASE makes every character class slower.
+QUANTITY_RE = re.compile(
+    r"(\d[\d,]*(?:\.\d+)?)"
+    r"(?:[ \t]*(m³|[a-zA-Z]+3?)(?:[ \t]+(?:(?i:of)[ \t]+)?((?i:steam|met(?:er|re)s?)))?)?"
+)
+
+
+def parse_numbers(token: str):
+    # Fast path: no comma means a plain float literal
+    if "," not in token:
+        return [float(token)]
+    token = token.rstrip(",")
+    if GROUPED_NUMBER_RE.fullmatch(token):
+        return [float(token.replace(",", ""))]
+    return [float(t) for t in token.split(",") if t]
+
+
+@lru_cache(maxsize=512)
+def normalize_unit(unit, tail=""):
+    # Returns the UNITS key for a captured unit word, or None if it is not a unit.
+    # "tonnes" + "steam" -> "tonnes of steam", "cubic" + "meters" -> "cubic meters"
+    unit = unit.lower()
+    if tail:
+        tail = tail.lower()
+        key = f"{unit} of steam" if tail == "steam" else f"{unit} {tail}"
+        if key in UNITS:
+            return key
+    return unit if unit in UNITS else None
+
+
+# One scan of the line -> list of (value, unit) where value is the number as
+# written and unit is its UNITS key ("kl", "tonnes of steam") or None. Scaling
+# waits for to_unit, once the target module's unit is known.
+def quantities_from_text(s: str):
+    out = []
+    append = out.append
+    for num, unit, tail in QUANTITY_RE.findall(s):
+        if "," in num:
+            # the unit belongs to the last number of a comma-listed token
+            values = parse_numbers(num)
+            value = values.pop()
+            out.extend((v, None) for v in values)
+        else:
+            value = float(num)
+        append((value, normalize_unit(unit, tail) if unit else None))
+    return out
+
+
+# Multiplier from a UNITS key to target_unit, or None if the two measure
+# different things (kWh vs litres, kg vs trees).
+@lru_cache(maxsize=512)
+def conversion_factor(unit, target_unit):
+    normalized, mult = UNITS[unit]
+    if normalized == target_unit:
+        return mult
+    conv = CONVERSIONS.get((normalized, target_unit))
+    return None if conv is None else mult * conv
+
+
+# Express a quantity in target_unit. Unitless numbers, and numbers whose unit
+# cannot be converted to target_unit, are kept at their raw written value
+# (no multiplier), which is what the unit-blind scrape always summed.
+def to_unit(value, unit, target_unit):
+    if unit is None:
+        return value
+    factor = conversion_factor(unit, target_unit)
+    return value if factor is None else value * factor
+
+
+# Same result as summing to_unit over quantities_from_text, without building
+# the intermediate list; the per-gas pages call this on whole documents.
+# Reading units makes this ~1.9x slower than the unit-blind re.findall the
+# pages used before (see bench_unit_parser.py); it is a correctness change.
+def sum_usage(s: str, target_unit):
+    total = 0.0
+    for num, unit, tail in QUANTITY_RE.findall(s):
+        if "," in num:
+            values = parse_numbers(num)
+            value = values.pop()
+            total += sum(values)
+        else:
+            value = float(num)
+        if unit:
+            key = normalize_unit(unit, tail)
+            if key is not None:
+                factor = conversion_factor(key, target_unit)
+                if factor is not None:
+                    value *= factor
+        total += value
+    return total
@@ -2,8 +2,8 @@ import streamlit as st
 import pytesseract
 from PIL import Image
 import fitz  # PyMuPDF
-import re
 from report_generator import generate_pdf_report
+from unit_parser import sum_usage
 import matplotlib.pyplot as plt
 
 def extract_text(uploaded_file):
@@ -33,8 +33,7 @@ def vapor_app():
 
             keywords = ["vapor", "steam", "cubic meters", "m3"]
             if contains_keywords(content, keywords):
-                matches = re.findall(r"\d+\.?\d*", content)
-                units = sum([float(m) for m in matches])
+                units = sum_usage(content, "m3")
 
                 # Assumed emission factor for industrial vapor: 0.0004 kg CO2 per cubic meter
                 emission = round(units * 0.0004, 4)
@@ -2,8 +2,8 @@ import streamlit as st
 import pytesseract
 from PIL import Image
 import fitz  # PyMuPDF
-import re
 from report_generator import generate_pdf_report
+from unit_parser import sum_usage
 import matplotlib.pyplot as plt
 
 def extract_text(uploaded_file):
@@ -33,8 +33,7 @@ def water_usage_app():
 
             keywords = ["water", "litres", "liters", "usage", "consumption"]
             if contains_keywords(content, keywords):
-                matches = re.findall(r"\d+\.?\d*", content)
-                units = sum([float(m) for m in matches])
+                units = sum_usage(content, "litres")
 
                 # Water usage emission factor (assumed): 0.0003 kg CO2 per litre
                 emission = round(units * 0.0003, 4)